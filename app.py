@@ -1,20 +1,35 @@
 import os
+import re
+import json
+import hmac
+import time
+import hashlib
+import secrets
+import socket
+import math
 import logging
+import shutil
 import tempfile
-import pdfplumber
+import threading
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from flask import Flask, request, render_template_string, jsonify
 from flask_httpauth import HTTPBasicAuth
 from werkzeug.security import generate_password_hash, check_password_hash
-import csv
-# Google Sheets API
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-
-# PDF parsers
+from werkzeug.utils import secure_filename
+
+# The project modules below read their settings from the environment at import time
+load_dotenv()
+
+# Google Sheets API (client libraries are imported on first use)
+from sheets_helper import fan_out, append_rows, discovery_document, API_ENDPOINT, PartialAppendError
+# Per-user spreadsheet, labels and routes
+from tenants import load_tenants, TenantCache, TENANTS_FILE
+
+# Opt-in per-request profiling
+from profiling import Profile, stage
+
+# PDF parsers (pdfplumber itself is imported on first upload)
 from read_pdf import get_transactions_uob, get_transactions_dbs, get_transactions_citi, get_transactions_ocbc
 
 # ---------------- Logging ----------------
@@ -25,100 +40,107 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ---------------- Load Config ----------------
-load_dotenv()
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 WEB_USERNAME = os.getenv("WEB_USERNAME")
 WEB_PASSWORD = os.getenv("WEB_PASSWORD")
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-
-if not SPREADSHEET_ID or not WEB_USERNAME or not WEB_PASSWORD:
-    logger.error("❌ Missing SPREADSHEET_ID or WEB_USERNAME/WEB_PASSWORD in .env")
+# Chunks of resumable uploads are kept here until the file is complete
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "statement-uploads"))
+# Seconds before an abandoned (or finished) chunked upload is deleted
+UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+# Largest statement accepted through chunked uploads, in bytes
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(50 * 1024 * 1024)))
+# Build the Sheets client and label table in the background once the server is up
+WARMUP = os.getenv("WARMUP", "0") == "1"
+# Seconds a successful login is remembered before the password hash is checked again (0 disables)
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+
+if not os.path.exists(TENANTS_FILE) and (not SPREADSHEET_ID or not WEB_USERNAME or not WEB_PASSWORD):
+    logger.error(f"❌ Missing SPREADSHEET_ID or WEB_USERNAME/WEB_PASSWORD in .env (or {TENANTS_FILE})")
     exit(1)
 
-# ---------------- Google Sheets ----------------
-def get_service():
-    """Authenticate and return Google Sheets service."""
-    creds = None
-    if os.path.exists("token.json"):
-        try:
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-        except Exception as e:
-            logger.warning(f"Invalid token.json, will recreate: {e}")
-            creds = None
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return build("sheets", "v4", credentials=creds)
+tenants = TenantCache(load_tenants())
 
-def load_labels(csv_path="transaction_labels.csv"):
-    """
-    Load type-keyword mapping from CSV and remove spaces for matching.
+# ---------------- Google Sheets ----------------
+def bulk_add_rows(tenant, transactions, sheet_name="Transactions", written=None):
     """
-    labels = []
-    try:
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                type_label = row.get("Type", "").strip().upper()
-                remarks = row.get("Remarks", "").replace(" ", "").upper()
-                description = row.get("Description", "").replace(" ", "").upper()
-                if type_label and (remarks or description):
-                    labels.append((type_label, [remarks, description]))
-    except FileNotFoundError:
-        logger.warning(f"⚠️ Label CSV file not found: {csv_path}")
-    return labels
+    Bulk append multiple transactions into the tenant's sheet and bank tabs in one call.
+    Returns the rows whose type was guessed by similarity (for review), or None on failure.
 
-def bulk_add_rows(spreadsheet_id, transactions, sheet_name="Transactions"):
-    """Bulk append multiple transactions into Google Sheets in one call."""
+    written is an optional set of (spreadsheet_id, range) targets an earlier
+    attempt already appended to; they are skipped, and the set is updated
+    with the targets written now, so a retry never duplicates rows.
+    """
+    written = set() if written is None else written
     try:
-        service = get_service()
+        service = tenant.service()
         values = []
-        # Load type labels from CSV
-        labels = load_labels()
-
-        for txn in transactions:
+        guessed = []
+        start = time.perf_counter()
+        with stage("classify"):
+            scored = tenant.classifier.classify_scored([txn[1] for txn in transactions])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"🏷️ Classified {len(transactions)} transactions for {tenant.name} in {elapsed_ms:.1f} ms "
+                    f"(cache: {tenant.classifier.stats()})")
+
+        for txn, (txn_type, confidence, method) in zip(transactions, scored):
             txn_date, description, amount, source = txn
-            txn_type = "OTHER"
-
-            # Remove spaces for matching
-            desc_normalized = description.replace(" ", "").upper()
-
-            for type_label, keywords in labels:
-                for keyword in keywords:
-                    if keyword and keyword in desc_normalized:
-                        txn_type = type_label
-                        break
-                if txn_type != "OTHER":
-                    break
             values.append([txn_date, amount, description, txn_type, source])
-        body = {"majorDimension": "ROWS", "values": values}
-        response = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range=sheet_name,
-            body=body,
-            valueInputOption="USER_ENTERED"
-        ).execute()
+            if method == "similarity":
+                guessed.append({"date": txn_date, "description": description,
+                                "type": txn_type, "confidence": confidence})
+        # Main sheet plus per-bank tabs in a single round trip
+        writes = fan_out(tenant.spreadsheet_id, sheet_name, values, tenant.routes)
+        if written:
+            logger.info(f"↩️ Skipping targets written by an earlier attempt: {sorted(written)}")
+        writes = {target: rows for target, rows in writes.items() if target not in written}
+        with stage("sheets append"):
+            response = append_rows(service, writes) if writes else []
+        written.update(writes)
         logger.info(f"✅ Bulk upload complete: {response}")
-        return True
-    except HttpError as err:
-        logger.error(f"❌ Bulk upload error: {err}")
-        return False
+        return guessed
+    except PartialAppendError as err:
+        written.update(err.written)
+        logger.error(f"❌ Bulk upload error: {err} (written: {err.written})")
+        return None
 
 # ---------------- Flask App ----------------
 app = Flask(__name__)
 auth = HTTPBasicAuth()
 
 # ---------------- Password Setup ----------------
-users = {WEB_USERNAME: generate_password_hash(WEB_PASSWORD)}
+# tenants.json only holds hashes; only the single .env user's password is hashed here
+users = {
+    name: settings.get("password_hash") or generate_password_hash(settings.get("password") or "")
+    for name, settings in tenants.tenants.items()
+    if settings.get("password_hash") or settings.get("password")
+}
+
+def current_tenant():
+    """State of the tenant the logged-in user belongs to."""
+    return tenants.get(auth.current_user())
+
+# Verified credentials: username -> (HMAC of username/password, expiry).
+# The HMAC key lives only in this process, so the cache never holds the
+# password itself and a cheap digest comparison replaces PBKDF2 until expiry.
+_AUTH_CACHE_KEY = secrets.token_bytes(32)
+_auth_cache = {}
+
+def _credential_digest(username, password):
+    message = f"{username}\0{password}".encode("utf-8")
+    return hmac.new(_AUTH_CACHE_KEY, message, hashlib.sha256).digest()
 
 @auth.verify_password
 def verify_password(username, password):
-    if username in users and check_password_hash(users.get(username), password):
+    if username not in users:
+        return None
+    digest = _credential_digest(username, password or "")
+    now = time.monotonic()
+    cached = _auth_cache.get(username)
+    if cached and cached[1] > now and hmac.compare_digest(cached[0], digest):
+        return username
+    if check_password_hash(users.get(username), password or ""):
+        if AUTH_CACHE_TTL > 0:
+            _auth_cache[username] = (digest, now + AUTH_CACHE_TTL)
         return username
     return None
 
@@ -156,9 +178,16 @@ UPLOAD_FORM = """
     #file-list li {
       margin-bottom: 5px;
       display: flex;
+      flex-wrap: wrap;
       justify-content: space-between;
       align-items: center;
     }
+    .file-progress {
+      flex-basis: 100%;
+      height: 14px;
+      margin-top: 4px;
+      font-size: 0.7rem;
+    }
   </style>
 </head>
 
@@ -183,7 +212,14 @@ const fileInput = document.getElementById('pdfs');
 const dropText = document.getElementById('drop-text');
 const fileList = document.getElementById('file-list');
 const uploadBtn = document.getElementById('upload-btn');
+// Each entry: { file, id, progress, status }; id identifies a resumable chunked upload
 let selectedFiles = [];
+let uploading = false;
+
+// Files larger than one chunk are sent in pieces that survive dropped connections
+const CHUNK_SIZE = {{ chunk_size }};
+const MAX_PARALLEL = 3;
+const MAX_RETRIES = 5;
 
 // Click to open file dialog
 dropArea.addEventListener('click', () => fileInput.click());
@@ -209,8 +245,12 @@ dropArea.addEventListener('drop', (e) => {
   addFiles(files);
 });
 
+function newUploadId() {
+  return Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+}
+
 function addFiles(files) {
-  selectedFiles = selectedFiles.concat(files);
+  selectedFiles = selectedFiles.concat(files.map(file => ({ file, id: newUploadId(), progress: 0, status: '' })));
   updateFileList();
 }
 
@@ -221,15 +261,18 @@ function updateFileList() {
     return;
   }
   dropText.textContent = "Selected files:";
-  selectedFiles.forEach((file, index) => {
+  selectedFiles.forEach((item, index) => {
     const li = document.createElement('li');
-    li.textContent = file.name;
+    const name = document.createElement('span');
+    name.textContent = item.file.name;
+    li.appendChild(name);
 
     // Add remove button
     const removeBtn = document.createElement('button');
     removeBtn.textContent = "❌";
     removeBtn.className = "btn btn-sm btn-outline-danger";
     removeBtn.style.marginLeft = "10px";
+    removeBtn.disabled = uploading;
 
 
     removeBtn.addEventListener('click', (e) => {
@@ -243,47 +286,183 @@ function updateFileList() {
     });
 
     li.appendChild(removeBtn);
+
+    // Per-file progress bar
+    const progress = document.createElement('div');
+    progress.className = "progress file-progress";
+    const bar = document.createElement('div');
+    bar.className = "progress-bar";
+    progress.appendChild(bar);
+    li.appendChild(progress);
+    item.bar = bar;
+    renderProgress(item);
+
     fileList.appendChild(li);
   });
 }
 
+function renderProgress(item) {
+  if (!item.bar) return;
+  item.bar.style.width = `${Math.round(item.progress * 100)}%`;
+  item.bar.textContent = item.status;
+  item.bar.classList.toggle('bg-success', item.status === 'done');
+  item.bar.classList.toggle('bg-danger', item.status === 'failed');
+}
+
+// POST with upload progress (fetch cannot report it); resolves for any HTTP status
+function post(url, formData, onProgress) {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+    xhr.open('POST', url);
+    xhr.upload.onprogress = (e) => { if (e.lengthComputable) onProgress(e.loaded); };
+    xhr.onload = () => resolve({ ok: xhr.status >= 200 && xhr.status < 300, status: xhr.status, text: xhr.responseText });
+    xhr.onerror = () => reject(new Error('network error'));
+    xhr.send(formData);
+  });
+}
+
+function sleep(ms) {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+async function uploadWhole(item) {
+  const formData = new FormData();
+  formData.append('pdf', item.file);
+  formData.append('upload_id', item.id);
+  const response = await post('/upload', formData, (loaded) => {
+    item.progress = loaded / item.file.size;
+    renderProgress(item);
+  });
+  if (!response.ok) throw new Error(response.text);
+  return JSON.parse(response.text);
+}
+
+async function receivedChunks(item) {
+  const response = await fetch(`/upload/chunks/${item.id}`);
+  if (!response.ok) return { received: [] };
+  return response.json();
+}
+
+async function uploadChunked(item) {
+  const file = item.file;
+  const total = Math.ceil(file.size / CHUNK_SIZE);
+
+  for (let attempt = 0; ; attempt++) {
+    try {
+      // Ask the server what it already has, so a retry resumes instead of restarting
+      const state = await receivedChunks(item);
+      if (state.status === 'ok') return state;
+      const received = new Set(state.received || []);
+      const pending = [];
+      for (let index = 0; index < total; index++) {
+        if (!received.has(index)) pending.push(index);
+      }
+      // Every chunk arrived but parsing or the Sheets write failed: the server
+      // keeps the chunks, and re-sending the last one assembles the file again
+      if (!pending.length) {
+        received.delete(total - 1);
+        pending.push(total - 1);
+      }
+      let sent = received.size * CHUNK_SIZE;
+      let result = null;
+
+      for (const index of pending) {
+        const chunk = file.slice(index * CHUNK_SIZE, (index + 1) * CHUNK_SIZE);
+        const formData = new FormData();
+        formData.append('index', index);
+        formData.append('total', total);
+        formData.append('size', file.size);
+        formData.append('chunk', chunk, file.name);
+        const response = await post(`/upload/chunks/${item.id}`, formData, (loaded) => {
+          item.progress = Math.min(1, (sent + loaded) / file.size);
+          renderProgress(item);
+        });
+        // Client errors and failed parses won't succeed on retry; timeouts and gateway errors might
+        const retryable = [408, 429, 502, 503, 504].includes(response.status);
+        if (response.status >= 400 && !retryable) {
+          throw Object.assign(new Error(response.text), { fatal: true });
+        }
+        if (!response.ok) throw new Error(response.text);
+        sent += chunk.size;
+        result = JSON.parse(response.text);
+      }
+      if (result && result.status === 'ok') return result;
+      throw new Error('upload incomplete');
+    } catch (err) {
+      if (err.fatal || attempt >= MAX_RETRIES) throw err;
+      item.status = `retrying (${attempt + 1})`;
+      renderProgress(item);
+      await sleep(1000 * 2 ** attempt);
+    }
+  }
+}
+
+// Run worker over items with at most `limit` in flight
+async function runPool(items, limit, worker) {
+  let next = 0;
+  const runners = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      await worker(items[next++]);
+    }
+  });
+  await Promise.all(runners);
+}
+
 
 // Upload files
 uploadBtn.addEventListener('click', async () => {
   if (!selectedFiles.length) return alert("Please select at least one PDF file!");
   const resultDiv = document.getElementById('result');
   resultDiv.innerHTML = 'Processing...';
+  uploading = true;
+  uploadBtn.disabled = true;
+  updateFileList();
 
   let successCount = 0;
-  let failCount = 0;
-
-  for (let i = 0; i < selectedFiles.length; i++) {
-    const formData = new FormData();
-    formData.append('pdf', selectedFiles[i]);
+  const failed = [];
+  const guessed = [];
 
+  await runPool(selectedFiles, MAX_PARALLEL, async (item) => {
+    item.status = 'uploading';
+    renderProgress(item);
     try {
-      const response = await fetch('/upload', { method: 'POST', body: formData });
-      if (!response.ok) {
-        failCount++;
-        const text = await response.text();
-        console.error(`File ${selectedFiles[i].name} failed:`, text);
-      } else {
-        const data = await response.json();
-        successCount += data.transactions_uploaded || 0;
-      }
+      const data = item.file.size > CHUNK_SIZE ? await uploadChunked(item) : await uploadWhole(item);
+      successCount += data.transactions_uploaded || 0;
+      guessed.push(...(data.guessed_types || []));
+      item.progress = 1;
+      item.status = 'done';
     } catch (err) {
-      failCount++;
-      console.error(`File ${selectedFiles[i].name} error:`, err.message);
+      failed.push(item);
+      item.status = 'failed';
+      console.error(`File ${item.file.name} failed:`, err.message);
     }
-  }
+    renderProgress(item);
+  });
 
   resultDiv.innerHTML = `<div class="alert alert-success">✅ Total transactions uploaded: ${successCount}</div>`;
-  if (failCount > 0) {
-    resultDiv.innerHTML += `<div class="alert alert-warning">⚠️ ${failCount} file(s) failed to process.</div>`;
+  if (failed.length > 0) {
+    resultDiv.innerHTML += `<div class="alert alert-warning">⚠️ ${failed.length} file(s) failed to process. Press Upload again to resume them.</div>`;
+  }
+  if (guessed.length > 0) {
+    // Descriptions come from the PDFs, so build the list with textContent
+    const review = document.createElement('div');
+    review.className = "alert alert-info";
+    review.textContent = `🔎 ${guessed.length} type(s) were guessed from similar descriptions, please check:`;
+    const list = document.createElement('ul');
+    list.className = "mb-0";
+    guessed.forEach(g => {
+      const li = document.createElement('li');
+      li.textContent = `${g.date} ${g.description} → ${g.type} (${Math.round(g.confidence * 100)}%)`;
+      list.appendChild(li);
+    });
+    review.appendChild(list);
+    resultDiv.appendChild(review);
   }
 
-  // Clear selected files after upload
-  selectedFiles = [];
+  // Keep only the failed files; their chunked uploads resume where they stopped
+  uploading = false;
+  uploadBtn.disabled = false;
+  selectedFiles = failed;
   updateFileList();
 });
   </script>
@@ -291,11 +470,47 @@ uploadBtn.addEventListener('click', async () => {
 </html>
 """
 
+# ---------------- PDF Processing ----------------
+def process_pdf(pdf_path, tenant, state_dir=None):
+    """
+    Parse a statement, upload its transactions for tenant and return (response body, status).
+    With state_dir, the Sheets targets already written are remembered there so
+    that retrying a failed upload only writes the rest.
+    """
+    import pdfplumber
+
+    with stage("pdfplumber.open"):
+        pdf = pdfplumber.open(pdf_path)
+    with pdf:
+        with stage("detect bank"):
+            first_page_text = pdf.pages[0].extract_text() or ""
+        if "DBS" in first_page_text:
+            parser = get_transactions_dbs
+        elif "UOB" in first_page_text:
+            parser = get_transactions_uob
+        elif "CITI" in first_page_text:
+            parser = get_transactions_citi
+        elif "OCBC" in first_page_text:
+            parser = get_transactions_ocbc
+        else:
+            return "⚠️ Bank not recognized in PDF", 400
+        with stage(parser.__name__):
+            transactions = parser(pdf)
+
+    written = _written_targets(state_dir)
+    guessed = bulk_add_rows(tenant, transactions, written=written)
+    _save_written_targets(state_dir, written)
+    if guessed is not None:
+        # Types matched by similarity rather than a label keyword, worth a second look
+        return {"status": "ok", "transactions_uploaded": len(transactions), "guessed_types": guessed}, 200
+    else:
+        return "⚠️ Failed to upload transactions", 500
+
 # ---------------- Routes ----------------
 @app.route("/")
 @auth.login_required
 def index():
-    return render_template_string(UPLOAD_FORM)
+    return render_template_string(UPLOAD_FORM, chunk_size=CHUNK_SIZE)
 
 @app.route("/upload", methods=["POST"])
 @auth.login_required
@@ -310,25 +525,22 @@ def upload_pdf():
         file.save(tmp_file.name)
         tmp_file_path = tmp_file.name
 
+    # Opt-in per request: /upload?profile=1 or an "X-Profile: 1" header
+    profiled = request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"
+    # With an upload id, a retry after a partly failed Sheets write skips the targets already written
+    upload_id = request.form.get("upload_id", "")
+    state_dir = _upload_path(upload_id) if _UPLOAD_ID.match(upload_id) else None
+
     try:
-        with pdfplumber.open(tmp_file_path) as pdf:
-            first_page_text = pdf.pages[0].extract_text() or ""
-            if "DBS" in first_page_text:
-                transactions = get_transactions_dbs(pdf)
-            elif "UOB" in first_page_text:
-                transactions = get_transactions_uob(pdf)
-            elif "CITI" in first_page_text:
-                transactions = get_transactions_citi(pdf)
-            elif "OCBC" in first_page_text:
-                transactions = get_transactions_ocbc(pdf)
-            else:
-                return "⚠️ Bank not recognized in PDF", 400
-
-        success = bulk_add_rows(SPREADSHEET_ID, transactions)
-        if success:
-            return jsonify({"status": "ok", "transactions_uploaded": len(transactions)})
-        else:
-            return "⚠️ Failed to upload transactions", 500
+        if state_dir is not None:
+            os.makedirs(state_dir, exist_ok=True)
+        with Profile(f"upload-{file.filename}") if profiled else nullcontext() as profile:
+            body, status = process_pdf(tmp_file_path, current_tenant(), state_dir)
+        if status == 200 and state_dir is not None:
+            shutil.rmtree(state_dir, ignore_errors=True)
+        if profile is not None and isinstance(body, dict):
+            body["profile"] = profile.report
+        return (jsonify(body) if isinstance(body, dict) else body), status
     except Exception as e:
         logger.error(f"Error processing PDF: {e}")
         return f"⚠️ Error processing PDF: {str(e)}", 500
@@ -337,6 +549,173 @@ def upload_pdf():
             os.remove(tmp_file_path)
             logger.info(f"✅ Temp file deleted: {tmp_file_path}")
 
+# ---------------- Resumable Uploads ----------------
+# Large files arrive as numbered chunks under UPLOAD_DIR/<user>/<upload id>/.
+# When the last one lands the parts are joined and parsed straight away; the
+# result is kept so a retried final chunk gets the same answer back.
+_UPLOAD_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Every chunk but the last is exactly CHUNK_SIZE bytes; the page uses the same value
+CHUNK_SIZE = 1024 * 1024
+
+def _upload_path(upload_id):
+    user = secure_filename(auth.current_user() or "") or "anonymous"
+    return os.path.join(UPLOAD_DIR, user, upload_id)
+
+def _received_chunks(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(name[5:]) for name in os.listdir(path) if name.startswith("part-") and name[5:].isdigit())
+
+def _upload_meta(path, total, size):
+    """
+    Record total and size for a new upload, or check them against what the
+    first chunk of this upload id recorded. Returns False on a mismatch.
+    """
+    meta = os.path.join(path, "meta.json")
+    try:
+        fd = os.open(meta, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        with open(meta) as f:
+            stored = json.load(f)
+        return stored == {"total": total, "size": size}
+    with os.fdopen(fd, "w") as f:
+        json.dump({"total": total, "size": size}, f)
+    return True
+
+def _upload_result(path):
+    try:
+        with open(os.path.join(path, "result.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _written_targets(path):
+    """(spreadsheet_id, range) targets an earlier attempt of this upload wrote to."""
+    if path is None:
+        return set()
+    try:
+        with open(os.path.join(path, "written.json")) as f:
+            return {tuple(target) for target in json.load(f)}
+    except FileNotFoundError:
+        return set()
+
+def _save_written_targets(path, written):
+    if path is None:
+        return
+    with open(os.path.join(path, "written.json"), "w") as f:
+        json.dump(sorted(written), f)
+
+def _expire_uploads():
+    """Delete upload folders untouched for UPLOAD_TTL seconds."""
+    cutoff = time.time() - UPLOAD_TTL
+    try:
+        users = os.listdir(UPLOAD_DIR)
+    except OSError:
+        return
+    # Parallel uploads expire concurrently, so any entry may vanish under us
+    for user in users:
+        user_dir = os.path.join(UPLOAD_DIR, user)
+        try:
+            upload_ids = os.listdir(user_dir)
+        except OSError:
+            continue
+        for upload_id in upload_ids:
+            path = os.path.join(user_dir, upload_id)
+            try:
+                expired = os.path.getmtime(path) < cutoff
+            except OSError:
+                continue
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
+
+@app.route("/upload/chunks/<upload_id>", methods=["GET"])
+@auth.login_required
+def upload_status(upload_id):
+    """Chunks received so far, or the final result if the upload is complete."""
+    if not _UPLOAD_ID.match(upload_id):
+        return "⚠️ Invalid upload id", 400
+    path = _upload_path(upload_id)
+    result = _upload_result(path)
+    if result is not None:
+        return jsonify(result)
+    return jsonify({"status": "partial", "received": _received_chunks(path)})
+
+@app.route("/upload/chunks/<upload_id>", methods=["POST"])
+@auth.login_required
+def upload_chunk(upload_id):
+    """Store one chunk; the request carrying the last missing chunk parses the statement."""
+    if not _UPLOAD_ID.match(upload_id):
+        return "⚠️ Invalid upload id", 400
+    try:
+        index = int(request.form["index"])
+        total = int(request.form["total"])
+        size = int(request.form["size"])
+    except (KeyError, ValueError):
+        return "⚠️ index, total and size are required", 400
+    if size > UPLOAD_MAX_SIZE:
+        return f"⚠️ File is larger than {UPLOAD_MAX_SIZE // (1024 * 1024)} MB", 413
+    # total follows from size, so a client with another chunk size is turned away up front
+    if size <= 0 or total != math.ceil(size / CHUNK_SIZE) or not 0 <= index < total or "chunk" not in request.files:
+        return "⚠️ Invalid chunk", 400
+    expected = min(CHUNK_SIZE, size - index * CHUNK_SIZE)
+    data = request.files["chunk"].stream.read(CHUNK_SIZE + 1)
+    if len(data) != expected:
+        return f"⚠️ Chunk {index} should be {expected} bytes", 400
+
+    path = _upload_path(upload_id)
+    result = _upload_result(path)
+    if result is not None:
+        return jsonify(result)
+    if not os.path.isdir(path):
+        _expire_uploads()
+        os.makedirs(path, exist_ok=True)
+    if not _upload_meta(path, total, size):
+        return "⚠️ This upload id was started for a different file", 400
+
+    part = os.path.join(path, f"part-{index:05d}")
+    with open(f"{part}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{part}.tmp", part)
+    received = _received_chunks(path)
+    if not set(range(total)) <= set(received):
+        return jsonify({"status": "partial", "received": received})
+
+    # Only one request may assemble; a concurrent duplicate of the last chunk waits for the result
+    lock = os.path.join(path, "assembling")
+    try:
+        os.mkdir(lock)
+    except FileExistsError:
+        return jsonify({"status": "assembling"}), 202
+
+    assembled = os.path.join(path, "statement.pdf")
+    try:
+        with open(assembled, "wb") as out:
+            for i in range(total):
+                with open(os.path.join(path, f"part-{i:05d}"), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        if os.path.getsize(assembled) != size:
+            shutil.rmtree(path, ignore_errors=True)
+            return "⚠️ Uploaded size does not match, please upload the file again", 400
+
+        body, status = process_pdf(assembled, current_tenant(), path)
+        if status == 200:
+            with open(os.path.join(path, "result.json"), "w") as f:
+                json.dump(body, f)
+            for name in os.listdir(path):
+                if name.startswith("part-"):
+                    os.remove(os.path.join(path, name))
+        return (jsonify(body) if isinstance(body, dict) else body), status
+    except Exception as e:
+        # The message may name files under UPLOAD_DIR, so it only goes to the log
+        logger.error(f"Error processing PDF: {e}")
+        return "⚠️ Error processing PDF, please upload the file again", 500
+    finally:
+        # Leave the chunks in place after a failure so the last chunk can simply be re-sent
+        if os.path.exists(assembled):
+            os.remove(assembled)
+        if os.path.isdir(lock):
+            os.rmdir(lock)
+
 @app.route("/manual", methods=["POST"])
 @auth.login_required
 def manual_transaction():
@@ -350,10 +729,11 @@ def manual_transaction():
             data.get("remarks", ""),
             data.get("payment_method", "Manual")
         ]]
-        service = get_service()
+        tenant = current_tenant()
+        service = tenant.service()
         resource = {"majorDimension": "ROWS", "values": row}
         service.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
+            spreadsheetId=tenant.spreadsheet_id,
             range="Transactions",
             body=resource,
             valueInputOption="USER_ENTERED",
@@ -363,6 +743,56 @@ def manual_transaction():
         logger.error(f"Manual add failed: {e}")
         return f"⚠️ Error: {str(e)}", 500
 
+@app.route("/stats")
+@auth.login_required
+def stats():
+    """Classification cache hit/miss counters for this user, and tenant cache counters."""
+    return jsonify({
+        "classification_cache": current_tenant().classifier.stats(),
+        "tenant_cache": tenants.stats(),
+    })
+
+# ---------------- Preload ----------------
+def preload():
+    """
+    Load everything workers can share before they are forked: pdfplumber,
+    the tenants' label tables and similarity indexes, and the Sheets
+    discovery document.
+    Used by gunicorn.conf.py so workers inherit them copy-on-write.
+    """
+    import pdfplumber  # noqa: F401
+    import googleapiclient.discovery  # noqa: F401
+    tenants.preload()
+    discovery_document(API_ENDPOINT)
+    logger.info("✅ Shared state preloaded")
+
+# ---------------- Warm-up ----------------
+def warm_up(port=None, timeout=30):
+    """
+    Load pdfplumber and each tenant's label classifier and Sheets client in a background thread.
+    If a port is given, wait until the server accepts connections first so the
+    warm-up never delays the first request being served.
+    """
+    def _run():
+        if port is not None:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            import pdfplumber  # noqa: F401
+            tenants.preload(connect=True)
+            logger.info("✅ Warm-up complete")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    threading.Thread(target=_run, name="warm-up", daemon=True).start()
+
 # ---------------- Run ----------------
 if __name__ == "__main__":
+    if WARMUP:
+        warm_up(port=5002)
     app.run(host="0.0.0.0", port=5002)
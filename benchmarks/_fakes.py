@@ -0,0 +1,50 @@
+"""In-process stand-ins shared by the benchmark scripts."""
+import os
+
+
+def set_benchmark_env():
+    """Fill in the config app.py refuses to start without."""
+    os.environ.setdefault("SPREADSHEET_ID", "benchmark-sheet")
+    os.environ.setdefault("WEB_USERNAME", "bench")
+    os.environ.setdefault("WEB_PASSWORD", "bench-password")
+
+
+class _Call:
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self, *args, **kwargs):
+        return self._result
+
+
+class _Batch:
+    def __init__(self, callback):
+        self._callback = callback
+        self._calls = []
+
+    def add(self, call, request_id):
+        self._calls.append((request_id, call))
+
+    def execute(self):
+        for request_id, call in self._calls:
+            self._callback(request_id, call.execute(), None)
+
+
+class FakeService:
+    """Mimics the values.append and batch calls sheets_helper makes, without any network."""
+
+    def __init__(self):
+        self.appended = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def append(self, spreadsheetId, range, body, valueInputOption):
+        self.appended.append((spreadsheetId, range, body["values"]))
+        return _Call({"updates": {"updatedRows": len(body["values"])}})
+
+    def new_batch_http_request(self, callback):
+        return _Batch(callback)
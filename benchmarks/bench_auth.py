@@ -0,0 +1,69 @@
+"""
+Requests/sec on /manual and /upload with and without the verified-credential cache.
+
+Sheets calls are replaced by an in-memory fake so the numbers isolate the
+cost of HTTP basic auth plus request handling.
+
+Usage:
+    python -m benchmarks.bench_auth [--requests 200] [--pdf statement.pdf]
+"""
+import argparse
+import base64
+import time
+
+from benchmarks._fakes import FakeService, set_benchmark_env
+
+set_benchmark_env()
+
+import app  # noqa: E402
+import sheets_helper  # noqa: E402
+
+
+def _auth_header():
+    token = base64.b64encode(f"{app.WEB_USERNAME}:{app.WEB_PASSWORD}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def _run(client, n, send):
+    start = time.perf_counter()
+    for _ in range(n):
+        response = send(client)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pdf", help="statement used for /upload (skipped if omitted)")
+    args = parser.parse_args()
+
+    fake = FakeService()
+    sheets_helper.SheetsClient.service = lambda self: fake
+    headers = _auth_header()
+    client = app.app.test_client()
+
+    def manual(c):
+        payload = {"date": "12 JUL", "value": "2.00", "description": "SWEE HENG BAKERY"}
+        return c.post("/manual", json=payload, headers=headers)
+
+    def upload(c):
+        with open(args.pdf, "rb") as f:
+            return c.post("/upload", data={"pdf": (f, "statement.pdf")}, headers=headers)
+
+    endpoints = [("/manual", manual)]
+    if args.pdf:
+        endpoints.append(("/upload", upload))
+
+    print(f"{'endpoint':<10} {'uncached req/s':>15} {'cached req/s':>13}")
+    for name, send in endpoints:
+        app._auth_cache.clear()
+        app.AUTH_CACHE_TTL = 0
+        before = _run(client, args.requests, send)
+        app.AUTH_CACHE_TTL = 300
+        after = _run(client, args.requests, send)
+        print(f"{name:<10} {before:>15.1f} {after:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
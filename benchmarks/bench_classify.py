@@ -0,0 +1,64 @@
+"""
+Classification time for large batches with and without the memo cache.
+
+Batches are drawn from the labelled descriptions plus unseen merchants, so
+they repeat the way real statements do. Three runs are timed: the plain
+substring scan, a cold cache, and a fresh Classifier reloading the cache
+from disk (as after a restart).
+
+Usage:
+    python -m benchmarks.bench_classify [--rows 20000] [--unique 0.1]
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from classifier import LABELS_CSV, Classifier, load_labels, match_label, normalize
+
+
+def _batch(rows, unique_ratio, seed=0):
+    rng = random.Random(seed)
+    with open(LABELS_CSV, newline="", encoding="utf-8") as f:
+        known = [row["Description"] for row in csv.DictReader(f) if row.get("Description")]
+    batch = []
+    for i in range(rows):
+        if rng.random() < unique_ratio:
+            batch.append(f"MERCHANT {i} SINGAPORE")
+        else:
+            batch.append(rng.choice(known))
+    return batch
+
+
+def _time(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--unique", type=float, default=0.1, help="fraction of never-seen descriptions")
+    args = parser.parse_args()
+
+    batch = _batch(args.rows, args.unique)
+    labels = load_labels()
+    baseline = _time(lambda: [match_label(normalize(d), labels) for d in batch])
+    print(f"uncached substring scan: {baseline:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.json")
+        cold = Classifier(cache_path=cache_path)
+        ms = _time(lambda: cold.classify_many(batch))
+        print(f"cold cache:              {ms:8.1f} ms  {cold.stats()}")
+
+        restarted = Classifier(cache_path=cache_path)
+        ms = _time(lambda: restarted.classify_many(batch))
+        print(f"reloaded from disk:      {ms:8.1f} ms  {restarted.stats()}")
+
+
+if __name__ == "__main__":
+    main()
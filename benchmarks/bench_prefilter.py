@@ -0,0 +1,78 @@
+"""
+Per-bank effect of the page pre-filter in read_pdf: pages skipped and
+wall-clock parse time with PDF_PREFILTER off and on. Also checks that both
+modes extract identical transactions.
+
+Usage:
+    python -m benchmarks.bench_prefilter statements/*.pdf [--repeat 3]
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import pdfplumber
+
+import read_pdf
+
+PARSERS = [
+    ("DBS", read_pdf.get_transactions_dbs),
+    ("UOB", read_pdf.get_transactions_uob),
+    ("CITI", read_pdf.get_transactions_citi),
+    ("OCBC", read_pdf.get_transactions_ocbc),
+]
+
+
+def _detect(path):
+    with pdfplumber.open(path) as pdf:
+        first_page_text = pdf.pages[0].extract_text() or ""
+    for bank, parser in PARSERS:
+        if bank in first_page_text:
+            return bank, parser
+    return None, None
+
+
+def _parse(path, parser, prefilter):
+    read_pdf.PREFILTER = prefilter
+    # Re-open each time: pdfplumber caches parsed page objects on the PDF
+    with pdfplumber.open(path) as pdf:
+        start = time.perf_counter()
+        transactions = parser(pdf)
+        return time.perf_counter() - start, transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    totals = defaultdict(lambda: {"files": 0, "pages": 0, "skipped": 0, "off": 0.0, "on": 0.0})
+    for path in args.pdfs:
+        bank, parse = _detect(path)
+        if bank is None:
+            print(f"skipping {path}: bank not recognised")
+            continue
+        off = min(_parse(path, parse, False)[0] for _ in range(args.repeat))
+        read_pdf.PAGE_STATS.clear()
+        on, filtered = _parse(path, parse, True)
+        stats = dict(read_pdf.PAGE_STATS[bank])
+        on = min([on] + [_parse(path, parse, True)[0] for _ in range(args.repeat - 1)])
+        if filtered != _parse(path, parse, False)[1]:
+            print(f"⚠️ {path}: transactions differ with the pre-filter on")
+
+        row = totals[bank]
+        row["files"] += 1
+        row["pages"] += stats["pages"]
+        row["skipped"] += stats["skipped"]
+        row["off"] += off
+        row["on"] += on
+
+    print(f"{'bank':<6} {'files':>5} {'pages':>6} {'skipped':>8} {'full ms':>9} {'filtered ms':>12} {'saving':>7}")
+    for bank, row in totals.items():
+        saving = 1 - row["on"] / row["off"] if row["off"] else 0.0
+        print(f"{bank:<6} {row['files']:>5} {row['pages']:>6} {row['skipped']:>8} "
+              f"{row['off'] * 1000:>9.1f} {row['on'] * 1000:>12.1f} {saving:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Concurrent-upload throughput of the Flask dev server (python app.py) against
+the gunicorn production setup, both writing to the local Sheets stand-in.
+
+Usage:
+    python -m benchmarks.bench_serving --pdf statements/uob.pdf [--pdf ...]
+        [--requests 60] [--concurrency 8] [--workers 4] [--threads 4] [--latency-ms 150]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.load_test import report, run_load
+from benchmarks.sheets_stub import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5002
+STUB_PORT = 8091
+
+
+def _wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not open port {port}")
+
+
+def _run_mode(name, command, env, args):
+    print(f"\n=== {name}: {' '.join(command)}")
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(PORT)
+        results, wall = run_load(f"http://127.0.0.1:{PORT}", (env["WEB_USERNAME"], env["WEB_PASSWORD"]),
+                                 args.pdf, args.requests, args.concurrency, args.manual_ratio)
+        report(results, wall)
+        return len(results) / wall
+    finally:
+        proc.terminate()
+        proc.wait(timeout=90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", action="append", required=True)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--manual-ratio", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    args = parser.parse_args()
+    args.pdf = [os.path.abspath(path) for path in args.pdf]
+
+    serve(STUB_PORT, latency_ms=args.latency_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "SHEETS_API_ENDPOINT": f"http://127.0.0.1:{STUB_PORT}/",
+            "SPREADSHEET_ID": "benchmark-sheet",
+            "WEB_USERNAME": "bench",
+            "WEB_PASSWORD": "bench-password",
+            "CLASSIFY_CACHE_PATH": os.path.join(tmp, "classification_cache.json"),
+            "WEB_WORKERS": str(args.workers),
+            "WEB_THREADS": str(args.threads),
+            "PORT": str(PORT),
+        })
+        dev = _run_mode("dev server", [sys.executable, "app.py"], env, args)
+        prod = _run_mode(f"gunicorn {args.workers}x{args.threads}",
+                         [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], env, args)
+    print(f"\nthroughput: dev {dev:.2f} req/s, gunicorn {prod:.2f} req/s ({prod / dev:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Second-stage similarity classification time for a statement's worth of rows.
+
+Descriptions are generated by perturbing labelled descriptions (branch
+suffixes, truncation) and mixing in unrelated merchants in the usual
+"<NAME> PTE LTD SINGAPORE" / "<NAME> <branch> SINGAPORE" shapes, then
+classified in one batch against the TF-IDF index built from
+transaction_labels.csv. Besides timing it reports how many perturbed
+descriptions get their own type back and how many unrelated merchants are
+wrongly given a type.
+
+Usage:
+    python -m benchmarks.bench_similarity [--rows 1000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from classifier import SIMILARITY_THRESHOLD, SimilarityIndex, load_labels, normalize
+
+WORDS = ("GOLDEN DRAGON TRADING ENTERPRISE HOLDINGS SERVICES ASIA PACIFIC GLOBAL TECH DESIGN STUDIO MOTOR "
+         "HARDWARE FURNITURE LOGISTICS CONSULTING PRINTING ELECTRICAL RENOVATION ORIENT SUNRISE EVERGREEN").split()
+
+
+def _descriptions(documents, rows, seed=0):
+    """(normalised description, expected type or None for unrelated merchants) pairs."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(rows):
+        roll = rng.random()
+        type_label, base = rng.choice(documents)
+        name = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+        if roll < 0.3:
+            out.append((base[: max(6, int(len(base) * 0.8))] + f"{i % 97:02d}SINGAPORE", type_label))
+        elif roll < 0.5:
+            out.append((f"SMP*{base}", type_label))
+        elif roll < 0.75:
+            out.append((normalize(f"{name} PTE LTD SINGAPORE"), None))
+        else:
+            out.append((normalize(f"{name} {i % 997} SINGAPORE"), None))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    import numpy  # noqa: F401
+    import scipy.sparse  # noqa: F401
+    print(f"import numpy/scipy: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    documents = [(type_label, keywords[1]) for type_label, keywords in load_labels() if keywords[1]]
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    index.update(documents)
+    print(f"fit {len(documents)} labelled rows: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    index.update(documents + [("FOOD", "NEWBAKERYSINGAPORE")])
+    print(f"incremental refit (+1 row): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    labelled = _descriptions(documents, args.rows)
+    batch = [description for description, _ in labelled]
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        results = index.classify_batch(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"classify {args.rows} rows: best {min(timings):.1f} ms, worst {max(timings):.1f} ms")
+
+    positives = [(result, expected) for result, (_, expected) in zip(results, labelled) if expected]
+    negatives = [result for result, (_, expected) in zip(results, labelled) if not expected]
+    correct = sum(1 for (txn_type, score), expected in positives
+                  if score >= SIMILARITY_THRESHOLD and txn_type == expected)
+    false_positives = sum(1 for _, score in negatives if score >= SIMILARITY_THRESHOLD)
+    print(f"at similarity >= {SIMILARITY_THRESHOLD}: {correct}/{len(positives)} perturbed labels typed correctly, "
+          f"{false_positives}/{len(negatives)} unrelated merchants wrongly typed")
+
+
+if __name__ == "__main__":
+    main()
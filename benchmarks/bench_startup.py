@@ -0,0 +1,74 @@
+"""
+Cold-start import time for app.py and bot.py, broken down per module.
+
+Each entry point is imported in a fresh interpreter under ``-X importtime``;
+the report lists wall-clock import time and the slowest top-level imports,
+each followed by the modules it imports directly.
+
+Usage:
+    python -m benchmarks.bench_startup [--top 15] [--modules app bot]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_profile(module):
+    env = dict(os.environ)
+    env.setdefault("SPREADSHEET_ID", "benchmark-sheet")
+    env.setdefault("WEB_USERNAME", "bench")
+    env.setdefault("WEB_PASSWORD", "bench-password")
+    env.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines look like "import time:   self [us] | cumulative | imported package";
+    # nesting is shown by indentation of the package name. A module's line
+    # comes after the lines of everything it imported, so direct imports are
+    # collected until their top-level importer appears.
+    groups = []
+    children = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, _, rest = line.partition(":")
+        _self_us, cumulative_us, name = rest.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative_us), name.strip()))
+        elif depth == 0:
+            groups.append((int(cumulative_us), name.strip(), sorted(children, reverse=True)))
+            children = []
+    return wall, sorted(groups, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--modules", nargs="+", default=["app", "bot"])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        wall, modules = _import_profile(module)
+        print(f"\n{module}: {wall * 1000:.0f} ms wall-clock (interpreter start + import)")
+        # Slowest top-level imports, each followed by the modules it imports directly
+        lines = []
+        for cumulative_us, name, children in modules:
+            lines.append((cumulative_us, name))
+            lines.extend((child_us, "  " + child) for child_us, child in children)
+        for cumulative_us, name in lines[:args.top]:
+            print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
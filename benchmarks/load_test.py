@@ -0,0 +1,118 @@
+"""
+Load generator for the web app: concurrent PDF uploads and manual entries
+against a running server, reporting throughput, tail latency and errors.
+
+Run it against the app pointed at the local Sheets stand-in, for example:
+
+    python -m benchmarks.sheets_stub --latency-ms 150 --quota-per-minute 300 &
+    SHEETS_API_ENDPOINT=http://127.0.0.1:8089/ python app.py &
+    python -m benchmarks.load_test --pdf statements/uob.pdf --concurrency 8 --requests 200
+
+Credentials default to WEB_USERNAME / WEB_PASSWORD from the environment.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_load(url, auth, pdfs, total, concurrency, manual_ratio=0.5, seed=0):
+    """
+    Send total requests with the given concurrency; returns a list of
+    (kind, status, seconds) plus the overall wall-clock time.
+    """
+    rng = random.Random(seed)
+    pdf_bytes = [(os.path.basename(path), open(path, "rb").read()) for path in pdfs]
+    plan = [
+        "manual" if not pdf_bytes or rng.random() < manual_ratio else rng.choice(pdf_bytes)
+        for _ in range(total)
+    ]
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.auth = auth
+        return local.session
+
+    def send(job):
+        start = time.perf_counter()
+        try:
+            if job == "manual":
+                kind = "manual"
+                response = session().post(f"{url}/manual", json={
+                    "date": "12 JUL", "value": "2.00", "description": "LOAD TEST", "remarks": "Food",
+                }, timeout=300)
+            else:
+                kind = "upload"
+                name, content = job
+                response = session().post(f"{url}/upload", files={"pdf": (name, content, "application/pdf")},
+                                          timeout=300)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return kind, status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, plan))
+    return results, time.perf_counter() - start
+
+
+def report(results, wall):
+    by_kind = defaultdict(list)
+    for kind, status, seconds in results:
+        by_kind[kind].append((status, seconds))
+        by_kind["all"].append((status, seconds))
+
+    print(f"{len(results)} requests in {wall:.1f} s = {len(results) / wall:.1f} req/s")
+    print(f"{'kind':<7} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}  statuses")
+    for kind in ("upload", "manual", "all"):
+        rows = by_kind.get(kind)
+        if not rows:
+            continue
+        latencies = [seconds * 1000 for _, seconds in rows]
+        statuses = Counter(status for status, _ in rows)
+        errors = sum(n for status, n in statuses.items() if status != 200)
+        print(f"{kind:<7} {len(rows):>6} {percentile(latencies, 50):>8.0f} {percentile(latencies, 95):>8.0f} "
+              f"{percentile(latencies, 99):>8.0f} {max(latencies):>8.0f} {errors / len(rows):>7.1%}  {dict(statuses)}")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5002")
+    parser.add_argument("--user", default=os.getenv("WEB_USERNAME"))
+    parser.add_argument("--password", default=os.getenv("WEB_PASSWORD"))
+    parser.add_argument("--pdf", action="append", default=[], help="statement to upload (repeatable)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--manual-ratio", type=float, default=0.5, help="share of requests sent to /manual")
+    parser.add_argument("--stub", default="http://127.0.0.1:8089", help="Sheets stand-in to read counters from")
+    args = parser.parse_args()
+
+    results, wall = run_load(args.url.rstrip("/"), (args.user, args.password), args.pdf,
+                             args.requests, args.concurrency, args.manual_ratio)
+    report(results, wall)
+    try:
+        print("Sheets stand-in:", requests.get(f"{args.stub}/_stats", timeout=5).json())
+    except requests.RequestException:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Local stand-in for the parts of the Google Sheets v4 API this project uses:
+values.append, values.get, spreadsheets.batchUpdate (appendCells) and the
+multipart /batch endpoint sheets_helper.append_rows sends fan-out writes to.
+
+Rows are kept in memory. Latency, random 429s and a per-minute write quota
+can be configured to size workers and quotas without touching Google.
+
+Usage:
+    python -m benchmarks.sheets_stub [--port 8089] [--latency-ms 150] [--jitter-ms 50]
+                                     [--error-rate 0.02] [--quota-per-minute 60]
+
+Then start the app or bot with SHEETS_API_ENDPOINT=http://127.0.0.1:8089/.
+GET /_stats returns request, row and error counters; GET /_rows dumps storage.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+APPEND = re.compile(r"^/v4/spreadsheets/([^/]+)/values/(.+):append$")
+GET = re.compile(r"^/v4/spreadsheets/([^/]+)/values/([^:]+)$")
+BATCH_UPDATE = re.compile(r"^/v4/spreadsheets/([^/:]+):batchUpdate$")
+
+
+class SheetsStub:
+    """In-memory spreadsheets plus the fault injection settings."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, quota_per_minute=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sheets = defaultdict(lambda: defaultdict(list))
+        self._writes = deque()
+        self.stats = defaultdict(int)
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def delay(self):
+        delay_ms = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    def _throttled(self, is_write):
+        """Decide whether this call gets a 429, from error_rate and the write quota."""
+        with self._lock:
+            if self._random.random() < self.error_rate:
+                self.stats["injected_429"] += 1
+                return True
+            if is_write and self.quota_per_minute:
+                now = time.monotonic()
+                while self._writes and now - self._writes[0] > 60:
+                    self._writes.popleft()
+                if len(self._writes) >= self.quota_per_minute:
+                    self.stats["quota_429"] += 1
+                    return True
+                self._writes.append(now)
+            return False
+
+    def handle(self, method, path, body):
+        """Dispatch one API call; returns (status, json_body)."""
+        path = urlsplit(path).path
+        self.count("requests")
+        is_write = method == "POST"
+        if self._throttled(is_write):
+            return 429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                   "message": "Quota exceeded for quota metric 'Write requests'"}}
+
+        match = APPEND.match(path)
+        if method == "POST" and match:
+            return self._append(unquote(match.group(1)), unquote(match.group(2)), body)
+        match = GET.match(path)
+        if method == "GET" and match:
+            return self._get(unquote(match.group(1)), unquote(match.group(2)))
+        match = BATCH_UPDATE.match(path)
+        if method == "POST" and match:
+            return self._batch_update(unquote(match.group(1)), body)
+        self.count("not_found")
+        return 404, {"error": {"code": 404, "status": "NOT_FOUND", "message": f"No route for {method} {path}"}}
+
+    def _append(self, spreadsheet_id, range_value, body):
+        rows = body.get("values", [])
+        sheet = range_value.split("!")[0]
+        with self._lock:
+            table = self._sheets[spreadsheet_id][sheet]
+            start = len(table) + 1
+            table.extend(rows)
+            self.stats["rows_appended"] += len(rows)
+        width = max((len(row) for row in rows), default=0)
+        return 200, {
+            "spreadsheetId": spreadsheet_id,
+            "tableRange": range_value,
+            "updates": {
+                "spreadsheetId": spreadsheet_id,
+                "updatedRange": f"{sheet}!A{start}:{chr(64 + max(width, 1))}{start + len(rows) - 1}",
+                "updatedRows": len(rows),
+                "updatedColumns": width,
+                "updatedCells": sum(len(row) for row in rows),
+            },
+        }
+
+    def _get(self, spreadsheet_id, range_value):
+        sheet = range_value.split("!")[0]
+        with self._lock:
+            rows = [list(row) for row in self._sheets[spreadsheet_id][sheet]]
+        return 200, {"range": range_value, "majorDimension": "ROWS", "values": rows}
+
+    def _batch_update(self, spreadsheet_id, body):
+        replies = []
+        for request in body.get("requests", []):
+            if "appendCells" not in request:
+                return 400, {"error": {"code": 400, "status": "INVALID_ARGUMENT",
+                                       "message": f"Unsupported request: {sorted(request)}"}}
+            append = request["appendCells"]
+            rows = [
+                [next(iter(cell.get("userEnteredValue", {"stringValue": ""}).values())) for cell in row.get("values", [])]
+                for row in append.get("rows", [])
+            ]
+            with self._lock:
+                self._sheets[spreadsheet_id][str(append.get("sheetId", 0))].extend(rows)
+                self.stats["rows_appended"] += len(rows)
+            replies.append({})
+        return 200, {"spreadsheetId": spreadsheet_id, "replies": replies}
+
+    def rows(self):
+        with self._lock:
+            return {sid: dict(sheets) for sid, sheets in self._sheets.items()}
+
+
+def _parse_batch(content_type, payload):
+    """Split a multipart/mixed batch body into (content_id, method, path, json_body) parts."""
+    message = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + payload)
+    calls = []
+    for part in message.get_payload():
+        raw = part.get_payload(decode=True) or part.get_payload().encode()
+        head, _, body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+        method, path, _ = head.split(b"\n", 1)[0].decode().split(" ", 2)
+        calls.append((part["Content-ID"], method, path, json.loads(body) if body.strip() else {}))
+    return calls
+
+
+def _batch_response(results):
+    boundary = f"batch_{uuid.uuid4().hex}"
+    chunks = []
+    for content_id, status, body in results:
+        content_id = content_id.strip("<>")
+        chunks.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <response-{content_id}>\r\n\r\n"
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+            f"{json.dumps(body)}\r\n"
+        )
+    chunks.append(f"--{boundary}--\r\n")
+    return f"multipart/mixed; boundary={boundary}", "".join(chunks).encode()
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json; charset=UTF-8"):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                return self._send(200, dict(stub.stats))
+            if self.path == "/_rows":
+                return self._send(200, stub.rows())
+            stub.delay()
+            self._send(*stub.handle("GET", self.path, {}))
+
+        def do_POST(self):
+            payload = self._body()
+            stub.delay()
+            if urlsplit(self.path).path.startswith("/batch"):
+                stub.count("batches")
+                results = [
+                    (content_id, *stub.handle(method, path, body))
+                    for content_id, method, path, body in _parse_batch(self.headers["Content-Type"], payload)
+                ]
+                content_type, body = _batch_response(results)
+                return self._send(200, body, content_type)
+            self._send(*stub.handle("POST", self.path, json.loads(payload or b"{}")))
+
+    return Handler
+
+
+def serve(port=8089, host="127.0.0.1", **options):
+    """Start the stand-in in a background thread; returns (server, stub)."""
+    stub = SheetsStub(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="sheets-stub", daemon=True).start()
+    return server, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--quota-per-minute", type=int, default=0, help="write calls allowed per minute (0 = unlimited)")
+    args = parser.parse_args()
+
+    server, stub = serve(args.port, args.host, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         error_rate=args.error_rate, quota_per_minute=args.quota_per_minute)
+    print(f"Sheets stand-in listening on http://{args.host}:{args.port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(dict(stub.stats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,8 @@
 import os
 import logging
+import threading
 from dotenv import load_dotenv
 
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    ConversationHandler,
-    ContextTypes,
-    filters,
-)
-import requests
-import tempfile
-import pdfplumber
-from read_pdf import get_transactions_uob, get_transactions_dbs, get_transactions_citi
-# Google Sheets API
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-
 # ---------------- Logging ----------------
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -33,43 +14,48 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
+# Chats listed in this file write to their own tenant's spreadsheet (see tenants.py)
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+# Build the Sheets client and load pdfplumber in the background after start-up
+WARMUP = os.getenv("WARMUP", "0") == "1"
 
-if not TELEGRAM_TOKEN or not SPREADSHEET_ID:
-    logger.error("❌ TELEGRAM_TOKEN or SPREADSHEET_ID missing in .env")
+if not TELEGRAM_TOKEN or not (SPREADSHEET_ID or os.path.exists(TENANTS_FILE)):
+    logger.error(f"❌ TELEGRAM_TOKEN or SPREADSHEET_ID missing in .env (or {TENANTS_FILE})")
     exit(1)
 
+# Telegram is only imported once the config is known to be usable;
+# requests, pdfplumber and the Google client libraries are imported on first use.
+from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    MessageHandler,
+    ConversationHandler,
+    ContextTypes,
+    filters,
+)
+import tempfile
+from read_pdf import get_transactions_uob, get_transactions_dbs, get_transactions_citi
+# Google Sheets API
+from sheets_helper import fan_out, append_rows, PartialAppendError
+# Per-chat spreadsheet, labels and routes
+from tenants import load_tenants, TenantCache
+
+tenants = TenantCache(load_tenants(TENANTS_FILE))
+
 # ---------------- Google Sheets ----------------
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+def add_row(tenant, date_str, value, description, remarks, payment_method, range_value="Transactions"):
+    """Append a row to the tenant's Google Sheet."""
+    from googleapiclient.errors import HttpError
 
-def get_service():
-    """Authenticate and return Google Sheets service."""
-    creds = None
-    if os.path.exists("token.json"):
-        try:
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-        except Exception as e:
-            logger.warning(f"Invalid token.json, will recreate: {e}")
-            creds = None
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return build("sheets", "v4", credentials=creds)
-
-def add_row(spreadsheet_id, date_str, value, description, remarks, payment_method, range_value="Transactions"):
-    """Append a row to Google Sheets."""
     try:
-        service = get_service()
+        service = tenant.service()
 
         row = [[date_str, value, description, remarks, payment_method]]
         resource = {"majorDimension": "ROWS", "values": row}
 
         response = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
+            spreadsheetId=tenant.spreadsheet_id,
             range=range_value,  # just the sheet name
             body=resource,
             valueInputOption="USER_ENTERED",
@@ -88,9 +74,10 @@ def add_row(spreadsheet_id, date_str, value, description, remarks, payment_metho
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return False
-def bulk_add_rows(spreadsheet_id, transactions, sheet_name="Transactions"):
+def bulk_add_rows(tenant, transactions, sheet_name="Transactions"):
     """
-    Bulk append multiple transactions into Google Sheets in one call.
+    Bulk append multiple transactions into the tenant's sheet and bank tabs in one call,
+    typed with the tenant's labels.
     
     transactions = [
         ['12 JUL', 'WWW.WAACOW.SG* WAACOW SINGAPORE', '87.86', 'UOB'],
@@ -98,50 +85,39 @@ def bulk_add_rows(spreadsheet_id, transactions, sheet_name="Transactions"):
         ['12 JUL', "MCDONALD'S (AMT2) SINGAPORE", '2.60', 'UOB']
     ]
     """
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
     try:
-        service = build("sheets", "v4", credentials=creds)
+        service = tenant.service()
+        txn_types = tenant.classifier.classify_many([txn[1] for txn in transactions])
 
         # Transform PDF rows into the schema your sheet expects
         values = []
-        for txn in transactions:
+        for txn, txn_type in zip(transactions, txn_types):
             txn_date, description, amount, source = txn
-            values.append([txn_date, amount, description, "", source])
+            values.append([txn_date, amount, description, txn_type, source])
 
-        body = {
-            "majorDimension": "ROWS",
-            "values": values
-        }
-
-        response = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range=sheet_name,   # just sheet name for append
-            body=body,
-            valueInputOption="USER_ENTERED"
-        ).execute()
+        # Main sheet plus per-bank tabs in a single round trip
+        response = append_rows(service, fan_out(tenant.spreadsheet_id, sheet_name, values, tenant.routes))
 
         logger.info(f"✅ Bulk upload complete: {response}")
         return True
 
-    except HttpError as err:
-        logger.error(f"❌ Bulk upload error: {err}")
+    except PartialAppendError as err:
+        logger.error(f"❌ Bulk upload error: {err} (written: {err.written})")
         return False
 # ---------------- Conversation States ----------------
 CHOOSING, MANUAL_INPUT, WAITING_FOR_PDF = range(3)
 
 # ---------------- Handlers ----------------
+def chat_tenant(update: Update):
+    """Tenant this chat writes to, or None if the chat is not linked to one."""
+    return tenants.for_chat(update.effective_chat.id)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if chat_tenant(update) is None:
+        logger.warning(f"Chat {update.effective_chat.id} is not linked to a tenant")
+        await update.message.reply_text("⚠️ This chat is not linked to a spreadsheet.")
+        return ConversationHandler.END
+
     keyboard = [["Manual Transaction", "Upload PDF"]]
     reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
     await update.message.reply_text(
@@ -183,9 +159,13 @@ async def handle_manual_input(update: Update, context: ContextTypes.DEFAULT_TYPE
             raise ValueError("Not enough fields provided")
 
         date_str, value, description, remarks, payment_method = [x.strip() for x in data]
+        tenant = chat_tenant(update)
+        if tenant is None:
+            await update.message.reply_text("⚠️ This chat is not linked to a spreadsheet.")
+            return ConversationHandler.END
 
         success = add_row(
-            SPREADSHEET_ID,
+            tenant,
             date_str,
             value,
             description,
@@ -211,7 +191,15 @@ async def handle_manual_input(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def handle_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Download uploaded PDF and process into Google Sheets."""
+    import requests
+    import pdfplumber
+
     try:
+        tenant = chat_tenant(update)
+        if tenant is None:
+            await update.message.reply_text("⚠️ This chat is not linked to a spreadsheet.")
+            return ConversationHandler.END
+
         document = update.message.document
         file_id = document.file_id
 
@@ -254,7 +242,7 @@ async def handle_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         transactions = get_transactions_citi(pdf)
                         break
 
-        success = bulk_add_rows(SPREADSHEET_ID, transactions)
+        success = bulk_add_rows(tenant, transactions)
 
         if success:
             await update.message.reply_text(f"✅ {len(transactions)} transactions uploaded to Google Sheets.")
@@ -271,6 +259,19 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("❌ Cancelled.", reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
 
+# ---------------- Warm-up ----------------
+def warm_up():
+    """Import pdfplumber and load each tenant's labels and Sheets client without blocking polling."""
+    def _run():
+        try:
+            import pdfplumber  # noqa: F401
+            tenants.preload(connect=True)
+            logger.info("✅ Warm-up complete")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+
+    threading.Thread(target=_run, name="warm-up", daemon=True).start()
+
 # ---------------- Main ----------------
 def main():
     app = Application.builder().token(TELEGRAM_TOKEN).build()
@@ -294,6 +295,8 @@ def main():
     app.add_handler(conv_handler)
 
     logger.info("Bot started!")
+    if WARMUP:
+        warm_up()
     app.run_polling()
 
 if __name__ == "__main__":
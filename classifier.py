@@ -0,0 +1,394 @@
+import os
+import re
+import csv
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LABELS_CSV = "transaction_labels.csv"
+# Where memoised classifications survive restarts, and how many are kept
+CACHE_PATH = os.getenv("CLASSIFY_CACHE_PATH", "classification_cache.json")
+CACHE_SIZE = int(os.getenv("CLASSIFY_CACHE_SIZE", "5000"))
+# Minimum cosine similarity for an unmatched description to take a labelled type
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.4"))
+NGRAM_SIZES = (3, 4)
+# Company suffixes, country names and branch/terminal numbers shared by
+# unrelated merchants; matched against normalised (space-free) descriptions
+BOILERPLATE = re.compile(r"PTE\.?LTD\.?|PTELIMITED|PRIVATELIMITED|SINGAPORE|LTD\.?$|SG$|\d+")
+# Version of the persisted cache entries, part of the fingerprint
+CACHE_FORMAT = 3
+
+
+def normalize(description):
+    """Key used for matching: uppercase with spaces stripped."""
+    return description.replace(" ", "").upper()
+
+
+def load_labels(csv_path=LABELS_CSV):
+    """
+    Load type-keyword mapping from CSV and remove spaces for matching.
+    """
+    labels = []
+    try:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                type_label = row.get("Type", "").strip().upper()
+                remarks = normalize(row.get("Remarks", ""))
+                description = normalize(row.get("Description", ""))
+                if type_label and (remarks or description):
+                    labels.append((type_label, [remarks, description]))
+    except FileNotFoundError:
+        logger.warning(f"⚠️ Label CSV file not found: {csv_path}")
+    return labels
+
+
+def match_label(desc_normalized, labels):
+    """Return the first label whose keyword appears in the description, else OTHER."""
+    for type_label, keywords in labels:
+        for keyword in keywords:
+            if keyword and keyword in desc_normalized:
+                return type_label
+    return "OTHER"
+
+
+def strip_boilerplate(desc_normalized):
+    """Drop the parts of a normalised description that say nothing about the merchant."""
+    return BOILERPLATE.sub("", desc_normalized)
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    padded = f" {text} "
+    return [padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1)]
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path + ".lock", shared by every process using the same cache file."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SimilarityIndex:
+    """
+    Character n-gram TF-IDF index over labelled descriptions.
+
+    Rows are (type, normalised description) pairs. Boilerplate such as
+    "PTE LTD SINGAPORE" is stripped before tokenising, otherwise it dominates
+    the vectors of short merchant names. update() only tokenises
+    rows that were added since the last fit; the TF-IDF matrix itself is
+    reassembled from the stored counts, which is a cheap array operation.
+    """
+
+    def __init__(self):
+        self._vocab = {}
+        self._df = Counter()
+        self._counts = {}
+        self._types = []
+        self._idf = None
+        self._matrix = None
+
+    def update(self, documents):
+        """Fit to the given (type, description) pairs, reusing unchanged rows."""
+        documents = set(documents)
+        current = set(self._counts)
+        added = documents - current
+        removed = current - documents
+        if self._matrix is not None and not added and not removed:
+            return
+        for doc in removed:
+            self._df.subtract(self._counts.pop(doc).keys())
+        for doc in added:
+            counts = Counter()
+            for gram in char_ngrams(strip_boilerplate(doc[1])):
+                column = self._vocab.setdefault(gram, len(self._vocab))
+                counts[column] += 1
+            self._counts[doc] = counts
+            self._df.update(counts.keys())
+        self._build()
+
+    def _build(self):
+        import numpy as np
+        from scipy import sparse
+
+        n_docs = len(self._counts)
+        df = np.zeros(len(self._vocab))
+        for column, count in self._df.items():
+            df[column] = count
+        self._idf = np.log((1 + n_docs) / (1 + df)) + 1
+        self._oov_idf = np.log(1 + n_docs) + 1
+
+        self._types = []
+        indptr, indices, data = [0], [], []
+        for (type_label, _), counts in self._counts.items():
+            self._types.append(type_label)
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=float), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(n_docs, len(self._vocab)),
+        )
+        self._matrix = self._normalize(matrix @ sparse.diags(self._idf)).tocsr()
+
+    @staticmethod
+    def _normalize(matrix, extra_sq_norms=None):
+        import numpy as np
+        from scipy import sparse
+
+        sq_norms = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+        if extra_sq_norms is not None:
+            sq_norms = sq_norms + extra_sq_norms
+        norms = np.sqrt(sq_norms)
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ matrix
+
+    def classify_batch(self, descriptions):
+        """
+        Return (type, cosine similarity) of the closest labelled description
+        for each normalised description, computed in one sparse product.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        if self._matrix is None or not self._types or not descriptions:
+            return [("OTHER", 0.0)] * len(descriptions)
+
+        indptr, indices, data = [0], [], []
+        # n-grams never seen in the labels still count towards the query norm,
+        # so a description sharing only a common suffix does not score highly
+        oov_sq = np.zeros(len(descriptions))
+        for row, text in enumerate(descriptions):
+            oov = 0
+            for gram, count in Counter(char_ngrams(strip_boilerplate(text))).items():
+                column = self._vocab.get(gram)
+                if column is None:
+                    oov += (count * self._oov_idf) ** 2
+                else:
+                    indices.append(column)
+                    data.append(count * self._idf[column])
+            oov_sq[row] = oov
+            indptr.append(len(indices))
+        queries = sparse.csr_matrix(
+            (np.asarray(data, dtype=float), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(descriptions), len(self._vocab)),
+        )
+        similarities = (self._normalize(queries, oov_sq) @ self._matrix.T).tocsr()
+        best = np.asarray(similarities.argmax(axis=1)).ravel()
+        scores = similarities.max(axis=1).toarray().ravel()
+        return [
+            (self._types[column] if score > 0 else "OTHER", float(score))
+            for column, score in zip(best, scores)
+        ]
+
+
+class Classifier:
+    """
+    Description -> type classifier with a bounded LRU memo of past results.
+
+    The memo is keyed by the normalised description, persisted to cache_path
+    and discarded whenever the content of the label CSV changes. Descriptions
+    no keyword matches fall through to a SimilarityIndex over the labelled
+    descriptions and take the closest type if it scores at least threshold.
+    Every result also says how the type was decided ("keyword",
+    "similarity" or "none" for OTHER) and with what confidence: 1.0 for a
+    keyword match, otherwise the similarity score. Guesses are singled out
+    for review by the method, since a similarity score can also reach 1.0.
+    """
+
+    def __init__(self, csv_path=LABELS_CSV, cache_path=CACHE_PATH, max_entries=CACHE_SIZE,
+                 threshold=SIMILARITY_THRESHOLD):
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.similarity_matches = 0
+        self._labels = []
+        self._index = SimilarityIndex()
+        self._index_fingerprint = None
+        self._memo = OrderedDict()
+        self._stat = None
+        self._fingerprint = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _csv_fingerprint(self):
+        # The threshold and entry format are part of the fingerprint because cached results depend on them
+        try:
+            with open(self.csv_path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = b""
+        return hashlib.sha256(content + f"|{self.threshold}|{CACHE_FORMAT}".encode()).hexdigest()
+
+    def _refresh(self):
+        """Reload labels and drop memoised results if the CSV changed since last use."""
+        try:
+            st = os.stat(self.csv_path)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        if self._fingerprint is not None and stat_key == self._stat:
+            return
+        self._stat = stat_key
+
+        fingerprint = self._csv_fingerprint()
+        if fingerprint == self._fingerprint:
+            return
+        first_load = self._fingerprint is None
+        self._fingerprint = fingerprint
+        self._labels = load_labels(self.csv_path)
+        self._memo.clear()
+        if first_load:
+            self._load_cache()
+        else:
+            logger.info(f"🏷️ {self.csv_path} changed, classification cache cleared")
+            self._dirty = True
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable classification cache {self.cache_path}: {e}")
+            return
+        if data.get("fingerprint") != self._fingerprint:
+            logger.info("🏷️ Label CSV changed since classification cache was saved, starting empty")
+            return
+        for key, (txn_type, confidence, method) in data.get("entries", [])[-self.max_entries:]:
+            self._memo[key] = (txn_type, confidence, method)
+
+    def _disk_entries(self):
+        """Entries another process saved for the same labels, oldest first."""
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if data.get("fingerprint") != self._fingerprint:
+            return []
+        return data.get("entries", [])
+
+    def _save(self):
+        # Other gunicorn workers save to the same file; keep their entries
+        # rather than letting the last writer win. Ours count as most recent.
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            with _file_lock(self.cache_path):
+                merged = OrderedDict((key, tuple(result)) for key, result in self._disk_entries())
+                for key, result in self._memo.items():
+                    merged.pop(key, None)
+                    merged[key] = result
+                while len(merged) > self.max_entries:
+                    merged.popitem(last=False)
+                self._memo = merged
+                data = {"fingerprint": self._fingerprint, "entries": list(merged.items())}
+                with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, encoding="utf-8") as tmp:
+                    json.dump(data, tmp)
+                os.replace(tmp.name, self.cache_path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save classification cache {self.cache_path}: {e}")
+
+    def load(self):
+        """Load the label table, persisted cache and similarity index now rather than on first use."""
+        with self._lock:
+            self._refresh()
+            self._fit_index()
+
+    def classify_many(self, descriptions):
+        """Classify a batch of descriptions, returning one type per description."""
+        return [txn_type for txn_type, _, _ in self.classify_scored(descriptions)]
+
+    def classify_scored(self, descriptions):
+        """Classify a batch of descriptions, returning (type, confidence, method) per description."""
+        with self._lock:
+            self._refresh()
+            keys = [normalize(description) for description in descriptions]
+            results = {}
+            unmatched = []
+            for key in keys:
+                if key in results:
+                    self.hits += 1
+                    continue
+                result = self._memo.get(key)
+                if result is not None:
+                    self._memo.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    result = (match_label(key, self._labels), 1.0, "keyword")
+                    if result[0] == "OTHER":
+                        unmatched.append(key)
+                results[key] = result
+
+            if unmatched:
+                for key, (txn_type, score) in zip(unmatched, self._similar(unmatched)):
+                    score = round(score, 3)
+                    if txn_type != "OTHER" and score >= self.threshold:
+                        logger.info(f"🔎 {key} -> {txn_type} (similarity {score:.2f})")
+                        results[key] = (txn_type, score, "similarity")
+                        self.similarity_matches += 1
+                    else:
+                        results[key] = ("OTHER", score, "none")
+
+            for key, result in results.items():
+                if key not in self._memo:
+                    self._memo[key] = result
+                    if len(self._memo) > self.max_entries:
+                        self._memo.popitem(last=False)
+                    self._dirty = True
+            if self._dirty:
+                self._save()
+            return [results[key] for key in keys]
+
+    def _fit_index(self):
+        if self._index_fingerprint != self._fingerprint:
+            self._index.update(
+                (type_label, keywords[1]) for type_label, keywords in self._labels if keywords[1]
+            )
+            self._index_fingerprint = self._fingerprint
+
+    def _similar(self, keys):
+        self._fit_index()
+        return self._index.classify_batch(keys)
+
+    def classify(self, description):
+        return self.classify_many([description])[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "similarity_matches": self.similarity_matches,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._memo),
+                "max_entries": self.max_entries,
+            }
+
+
+default_classifier = Classifier()
@@ -3,6 +3,8 @@ set -e  # Exit immediately if a command exits with a non-zero status
 
 APP_NAME="bank-pdf-app"
 IMAGE_NAME="bank-statement-pdf-app"
+# Named volume for state that must outlive the container (classification cache)
+DATA_VOLUME="bank-pdf-data"
 HOST_PORT=5000
 CONTAINER_PORT=5002
 
@@ -14,16 +16,26 @@ docker build -t $IMAGE_NAME .
 
 echo "🛑 Stopping and removing old container (if exists)..."
 if [ "$(docker ps -aq -f name=$APP_NAME)" ]; then
-    docker stop $APP_NAME
+    # Give in-flight uploads time to finish (gunicorn graceful_timeout is 60s)
+    docker stop -t 70 $APP_NAME
     docker rm $APP_NAME
 fi
 
+# Multi-tenant setups keep tenants.json, label files and tokens in ./tenants
+TENANT_MOUNT=""
+if [ -d tenants ]; then
+    TENANT_MOUNT="-v $(pwd)/tenants:/app/tenants"
+fi
+
 echo "🚀 Running new container..."
 docker run -d -p $HOST_PORT:$CONTAINER_PORT \
     --name $APP_NAME \
     -v $(pwd)/.env:/app/.env \
     -v $(pwd)/credentials.json:/app/credentials.json \
     -v $(pwd)/token.json:/app/token.json \
+    -v $DATA_VOLUME:/app/data \
+    -e CLASSIFY_CACHE_PATH=/app/data/classification_cache.json \
+    $TENANT_MOUNT \
     $IMAGE_NAME
 
 echo "✅ Deployment complete! App running on port $HOST_PORT."
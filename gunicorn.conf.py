@@ -0,0 +1,36 @@
+# Production server: gunicorn -c gunicorn.conf.py app:app
+#
+# The app and its shared state (labels, similarity index, Sheets discovery
+# document) are loaded once in the master and inherited copy-on-write by the
+# workers. Each worker serves WEB_THREADS requests at a time, so a slow PDF
+# parse only holds one thread instead of the whole server.
+#
+# Graceful restart: `kill -HUP <master pid>` starts fresh workers and lets the
+# old ones finish in-flight uploads for up to WEB_GRACEFUL_TIMEOUT seconds.
+# SIGTERM (docker stop) drains the same way before exiting.
+import gc
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 2)))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+# Large statements can take tens of seconds to parse
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "60"))
+accesslog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before workers fork
+    import app
+
+    app.preload()
+    # Keep the preloaded objects out of the collector so workers don't
+    # touch (and copy) their pages during garbage collection
+    gc.freeze()
@@ -0,0 +1,120 @@
+import os
+import re
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Where .prof call graphs and text summaries of profiled runs are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+TOP_N = 15
+
+# tracemalloc is process-wide, so only one profiled run traces allocations at a time
+_tracemalloc_lock = threading.Lock()
+_active = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage if the current thread is being profiled; otherwise a no-op."""
+    profile = getattr(_active, "profile", None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.stages.append({"stage": name, "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+
+class Profile:
+    """
+    Profile one pipeline run on the current thread.
+
+    cProfile only hooks the thread that enters the block, so concurrent
+    requests are not profiled. tracemalloc cannot be limited to one thread:
+    while it runs, other threads pay its overhead and their allocations show
+    up in the snapshot, and a second profiled run started meanwhile skips
+    allocation tracing. After the block, report holds the stage timings, top
+    functions and top allocation sites, and the .prof call graph (for
+    snakeviz, gprof2dot or flameprof) is saved under PROFILE_DIR.
+    """
+
+    def __init__(self, name, profile_dir=PROFILE_DIR, trace_memory=True):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:60]
+        self.path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}")
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.report = None
+        self._profiler = cProfile.Profile()
+        self._tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing() and _tracemalloc_lock.acquire(blocking=False):
+            self._tracing = True
+            tracemalloc.start(10)
+        _active.profile = self
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        wall_ms = (time.perf_counter() - self._start) * 1000
+        _active.profile = None
+
+        allocations, peak_kb = [], None
+        if self._tracing:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ])
+            peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+            _tracemalloc_lock.release()
+            allocations = [
+                {"site": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:TOP_N]
+            ]
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._profiler.dump_stats(f"{self.path}.prof")
+            with open(f"{self.path}.txt", "w") as f:
+                stats = pstats.Stats(self._profiler, stream=f)
+                stats.sort_stats("cumulative").print_stats(40)
+                f.write("Top allocation sites\n")
+                for allocation in allocations:
+                    f.write(f"{allocation['size_kb']:>10.1f} KiB {allocation['count']:>8} {allocation['site']}\n")
+            artifact = f"{self.path}.prof"
+        except OSError as e:
+            logger.warning(f"Could not save profile {self.path}: {e}")
+            artifact = None
+
+        stats = pstats.Stats(self._profiler)
+        top_functions = []
+        for func in sorted(stats.stats, key=lambda f: stats.stats[f][3], reverse=True)[:TOP_N]:
+            _, calls, own, cumulative, _ = stats.stats[func]
+            top_functions.append({
+                "function": pstats.func_std_string(func),
+                "calls": calls,
+                "own_ms": round(own * 1000, 1),
+                "cumulative_ms": round(cumulative * 1000, 1),
+            })
+
+        self.report = {
+            "artifact": artifact,
+            "wall_ms": round(wall_ms, 1),
+            "stages": self.stages,
+            "top_functions": top_functions,
+            "top_allocations": allocations,
+            "peak_traced_kb": peak_kb,
+        }
+        logger.info(f"🔬 Profile saved to {artifact} ({wall_ms:.0f} ms)")
+        return False
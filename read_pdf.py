@@ -1,18 +1,68 @@
-import pdfplumber
 import csv
 import re
 import os
 
 import time
+from operator import itemgetter
 from os import listdir
 from os.path import isfile, join
 from datetime import datetime
+from contextlib import nullcontext
+
+from profiling import Profile, stage
+
+# Page pre-filter: before full text extraction, each page's characters are
+# grouped into lines and matched (whitespace removed) against a per-bank
+# pattern. Pages with no matching line are skipped; the rest are cropped to
+# the band between the first and last matching line. Set PDF_PREFILTER=0 to
+# extract every full page as before.
+PREFILTER = os.getenv("PDF_PREFILTER", "1") != "0"
+REGION_PADDING = 1
+UOB_LINE = re.compile(r"\d{2}[A-Z]{3}\d{2}[A-Z]{3}")
+DBS_LINE = re.compile(r"^\d{2}([A-Z]{3}|[A-Z][a-z]{2}[A-Z])|PayLah")
+CITI_LINE = re.compile(r"^\d{2}[A-Z]{3}")
+OCBC_LINE = re.compile(r"^\d{2}\/\d{2}")
+# Pages seen and skipped per bank since start-up
+PAGE_STATS = {}
+
+
+def transaction_region(page, line_pattern):
+    """Bounding box of the band of the page holding lines that match line_pattern, or None."""
+    from pdfplumber.utils import cluster_objects
+
+    top = bottom = None
+    for line in cluster_objects(page.chars, "top", 3):
+        text = "".join(c["text"] for c in sorted(line, key=itemgetter("x0")))
+        if line_pattern.search("".join(text.split())):
+            line_top = min(c["top"] for c in line)
+            line_bottom = max(c["bottom"] for c in line)
+            top = line_top if top is None else min(top, line_top)
+            bottom = line_bottom if bottom is None else max(bottom, line_bottom)
+    if top is None:
+        return None
+    x0, page_top, x1, page_bottom = page.bbox
+    return (x0, max(page_top, top - REGION_PADDING), x1, min(page_bottom, bottom + REGION_PADDING))
+
+
+def transaction_texts(pdf, line_pattern, bank):
+    """Yield the text of every page region that may hold transactions."""
+    stats = PAGE_STATS.setdefault(bank, {"pages": 0, "skipped": 0})
+    for number, page in enumerate(pdf.pages, 1):
+        # Covers the caller's loop over this page's lines too
+        with stage(f"{bank} page {number}"):
+            stats["pages"] += 1
+            if PREFILTER:
+                bbox = transaction_region(page, line_pattern)
+                if bbox is None:
+                    stats["skipped"] += 1
+                    continue
+                page = page.crop(bbox)
+            yield page.extract_text()
 
 
 def get_transactions_uob(lines):
     transactions = []
-    for page in lines.pages:
-        text = page.extract_text()
+    for text in transaction_texts(lines, UOB_LINE, "UOB"):
         if text:
             lines = text.split("\n")
             for line in lines:
@@ -44,8 +94,7 @@ def get_transactions_dbs(lines):
     date_pattern = re.compile(r"^\d{2}\s([A-Z]{3}|[A-Z]{1}[a-z]{2}\s[A-Z])")
     transactions = []
     is_paylah = False
-    for page in lines.pages:
-        text = page.extract_text()
+    for text in transaction_texts(lines, DBS_LINE, "DBS"):
         if text:
             lines = text.split("\n")
             # print(lines)
@@ -76,8 +125,7 @@ def get_transactions_dbs(lines):
 def get_transactions_citi(lines):
     date_pattern = re.compile(r"^\d{2}[A-Z]{3}")
     transactions = []
-    for page in lines.pages:
-        text = page.extract_text()
+    for text in transaction_texts(lines, CITI_LINE, "CITI"):
         if text:
             lines = text.split("\n")
             for line in lines:
@@ -101,8 +149,7 @@ def get_transactions_citi(lines):
 def get_transactions_ocbc(lines):
     date_pattern = re.compile(r"^\d{2}\/\d{2}")
     transactions = []
-    for page in lines.pages:
-        text = page.extract_text()
+    for text in transaction_texts(lines, OCBC_LINE, "OCBC"):
         if text:
             lines = text.split("\n")
             
@@ -139,9 +186,18 @@ def get_transactions_ocbc(lines):
     return transactions
 
 if __name__ == "__main__":
+    import argparse
+    import pdfplumber
+
+    parser = argparse.ArgumentParser(description="Convert every PDF statement in a folder to CSV.")
+    parser.add_argument("directory", nargs="?",
+                        default=os.path.join("..","..", "Desktop", "Documents", "Credit_Card_Statements"))
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each file and save call graphs and allocation sites to profiles/")
+    args = parser.parse_args()
 
     #, "Paylah"
-    my_dir = os.path.abspath(os.path.join("..","..", "Desktop", "Documents", "Credit_Card_Statements"))
+    my_dir = os.path.abspath(args.directory)
     print(my_dir)
     onlyfiles = [f for f in listdir(my_dir) if isfile(join(my_dir, f))]
     for pdffile in onlyfiles:
@@ -150,7 +206,7 @@ if __name__ == "__main__":
         pdf_file = my_dir+'/'+pdffile
         csv_file = my_dir+'/csv/'+pdffile+".csv"
         # Open and read the PDF
-        with pdfplumber.open(pdf_file) as pdf:
+        with Profile(pdffile) if args.profile else nullcontext() as profile, pdfplumber.open(pdf_file) as pdf:
             # for page in pdf.pages:
             print(pdf)
             text = pdf.pages[0].extract_text()
@@ -187,5 +243,9 @@ if __name__ == "__main__":
             writer.writerows(transactions)
 
         print(f"CSV file '{csv_file}' created successfully with {len(transactions)} transactions!")
+        if profile is not None:
+            print(f"Profile: {profile.report['artifact']} ({profile.report['wall_ms']} ms)")
+            for allocation in profile.report["top_allocations"][:5]:
+                print(f"  {allocation['size_kb']:>10.1f} KiB  {allocation['site']}")
 
 
@@ -1,59 +1,235 @@
 import os
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import json
+import time
+import logging
+import threading
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
-def add_row(spreadsheet_id, date_str, value, description, remarks, payment_method, range_value):
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+# Extra tabs that receive a copy of a row, chosen by the first route whose
+# "match" substrings appear in the row's payment method / statement source.
+# Override with a JSON file of the same shape at SHEET_ROUTES_FILE.
+BANK_SPREADSHEET_ID = os.getenv("BANK_SPREADSHEET_ID", "1woLn_OuCpE5GQ-btYTacSTS2N738itIStWhXy0XkXww")
+# Base URL of a local Sheets API stand-in (see benchmarks/sheets_stub.py);
+# when set, requests go there unauthenticated instead of to Google
+API_ENDPOINT = os.getenv("SHEETS_API_ENDPOINT")
+ROUTES_FILE = os.getenv("SHEET_ROUTES_FILE", "sheet_routes.json")
+# Failed parts of a fan-out (429 / 5xx) are retried this many times, backing off from APPEND_BACKOFF seconds
+APPEND_RETRIES = int(os.getenv("SHEETS_APPEND_RETRIES", "4"))
+APPEND_BACKOFF = float(os.getenv("SHEETS_APPEND_BACKOFF", "1"))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_ROUTES = [
+    {"match": ["citi", "citibank"], "targets": [{"spreadsheet_id": BANK_SPREADSHEET_ID, "range": "Citibank!E:I"}]},
+    {"match": ["uob"], "targets": [{"spreadsheet_id": BANK_SPREADSHEET_ID, "range": "UOB!E:I"}]},
+]
+
+
+@lru_cache(maxsize=None)
+def discovery_document(root_url=None):
+    """Bundled Sheets v4 discovery document, parsed once per process."""
+    from googleapiclient.discovery_cache import get_static_doc
+    document = json.loads(get_static_doc("sheets", "v4"))
+    if root_url:
+        # rootUrl also determines the batch endpoint, so override it rather
+        # than passing api_endpoint in client_options
+        document["rootUrl"] = document["mtlsRootUrl"] = root_url.rstrip("/") + "/"
+    return document
+
+
+class SheetsClient:
+    """
+    Google Sheets client that authorises on first use.
+
+    Credentials are shared by all threads; the service object is built once per
+    thread because the underlying httplib2 connection is not thread-safe.
+    """
+
+    def __init__(self, token_path="token.json", credentials_path="credentials.json", api_endpoint=API_ENDPOINT):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.api_endpoint = api_endpoint
+        self._creds = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def credentials(self):
+        with self._lock:
+            creds = self._creds
+            if self.api_endpoint:
+                if creds is None:
+                    from google.auth.credentials import AnonymousCredentials
+                    creds = self._creds = AnonymousCredentials()
+                return creds
+            if creds is None and os.path.exists(self.token_path):
+                from google.oauth2.credentials import Credentials
+                try:
+                    creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+                except Exception as e:
+                    logger.warning(f"Invalid {self.token_path}, will recreate: {e}")
+                    creds = None
+            if not creds or not creds.valid:
+                if creds and creds.expired and creds.refresh_token:
+                    from google.auth.transport.requests import Request
+                    creds.refresh(Request())
+                else:
+                    from google_auth_oauthlib.flow import InstalledAppFlow
+                    flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
+                    creds = flow.run_local_server(port=0)
+                with open(self.token_path, "w") as token:
+                    token.write(creds.to_json())
+            self._creds = creds
+            return creds
 
+    def service(self):
+        """Return this thread's Sheets service, building it on first use."""
+        creds = self.credentials()
+        cached = getattr(self._local, "service", None)
+        if cached is None or cached[0] is not creds:
+            from googleapiclient.discovery import build_from_document
+            cached = (creds, build_from_document(discovery_document(self.api_endpoint), credentials=creds))
+            self._local.service = cached
+        return cached[1]
+
+
+default_client = SheetsClient()
+
+
+def get_service():
+    """Authenticate and return Google Sheets service."""
+    return default_client.service()
+
+
+def read_routes(path):
+    """Routing table from the JSON file at path; raises FileNotFoundError if there is none."""
+    with open(path, encoding="utf-8") as f:
+        routes = json.load(f)
+    logger.info(f"Loaded {len(routes)} sheet routes from {path}")
+    return routes
+
+
+@lru_cache(maxsize=None)
+def load_routes(path=ROUTES_FILE):
+    """Routing table from the JSON file at path, or DEFAULT_ROUTES if there is none."""
     try:
-        service = build("sheets", "v4", credentials=creds)
+        return read_routes(path)
+    except FileNotFoundError:
+        return DEFAULT_ROUTES
+
 
-        row = [[date_str, value, description, remarks, payment_method]]
-        resource = {"majorDimension": "ROWS", "values": row}
+def route_targets(source, routes=None):
+    """(spreadsheet_id, range) pairs a row from this source is copied to."""
+    source = source.lower()
+    for route in load_routes() if routes is None else routes:
+        if any(match.lower() in source for match in route["match"]):
+            return [(target["spreadsheet_id"], target["range"]) for target in route["targets"]]
+    return []
+
+
+def fan_out(spreadsheet_id, range_value, rows, routes=None):
+    """
+    Group rows by destination: every row goes to range_value, and is copied to
+    the routed tabs for its source (the last column of the row).
+    """
+    writes = {(spreadsheet_id, range_value): list(rows)}
+    for row in rows:
+        for target in route_targets(row[-1], routes):
+            writes.setdefault(target, []).append(row)
+    return writes
+
+
+class PartialAppendError(Exception):
+    """
+    Raised by append_rows when a target could not be written. written lists
+    the (spreadsheet_id, range) targets that were, so a retry can skip them.
+    """
+
+    def __init__(self, error, written):
+        super().__init__(str(error))
+        self.error = error
+        self.written = written
+
+
+def _retryable(error):
+    resp = getattr(error, "resp", None)
+    return resp is not None and resp.status in RETRYABLE_STATUS
+
+
+def append_rows(service, writes, retries=APPEND_RETRIES, backoff=APPEND_BACKOFF):
+    """
+    Append rows to several (spreadsheet_id, range) targets in one HTTP round trip.
+
+    The values.append calls are sent together as a single batch request, so
+    the cost does not grow with the number of tabs. A batch is not atomic:
+    parts that fail with a quota or server error are batched again on their
+    own, with exponential backoff, while the parts that succeeded are not
+    re-sent. Returns the responses in the order of writes; raises
+    PartialAppendError if a part still fails.
+    """
+    from googleapiclient.errors import HttpError
+
+    targets = list(writes)
+    responses = {}
+    for attempt in range(retries + 1):
+        pending = [target for target in targets if target not in responses]
+        calls = [
+            service.spreadsheets().values().append(
+                spreadsheetId=target_id,
+                range=target_range,
+                body={"majorDimension": "ROWS", "values": writes[(target_id, target_range)]},
+                valueInputOption="USER_ENTERED",
+            )
+            for target_id, target_range in pending
+        ]
+        errors = {}
+        if len(calls) == 1:
+            try:
+                responses[pending[0]] = calls[0].execute()
+            except HttpError as e:
+                errors[pending[0]] = e
+        else:
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    errors[pending[int(request_id)]] = exception
+                else:
+                    responses[pending[int(request_id)]] = response
+
+            batch = service.new_batch_http_request(callback=callback)
+            for i, call in enumerate(calls):
+                batch.add(call, request_id=str(i))
+            try:
+                batch.execute()
+            except HttpError as e:
+                errors.update((target, e) for target in pending if target not in responses)
+
+        if not errors:
+            break
+        error = next(iter(errors.values()))
+        written = [target for target in targets if target in responses]
+        if attempt == retries or not all(_retryable(e) for e in errors.values()):
+            raise PartialAppendError(error, written)
+        delay = backoff * 2 ** attempt
+        logger.warning(f"{len(errors)} of {len(pending)} appends failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+    return [responses[target] for target in targets]
+
+
+def add_row(spreadsheet_id, date_str, value, description, remarks, payment_method, range_value):
+    try:
+        service = get_service()
 
-        response = service.spreadsheets().values().append(
-            spreadsheetId=spreadsheet_id,
-            range=range_value,
-            body=resource,
-            valueInputOption="USER_ENTERED",
-        ).execute()
+        # The main range plus any bank-specific tabs, in one request
+        row = [date_str, value, description, remarks, payment_method]
+        responses = append_rows(service, fan_out(spreadsheet_id, range_value, [row]))
 
-        if response:
+        if responses[0]:
             print("✅ Row added")
-            # Also add to bank-specific sheets
-            if "citi" in payment_method.lower() or "citibank" in payment_method.lower():
-                service.spreadsheets().values().append(
-                    spreadsheetId="1woLn_OuCpE5GQ-btYTacSTS2N738itIStWhXy0XkXww",
-                    range="Citibank!E:I",
-                    body=resource,
-                    valueInputOption="USER_ENTERED",
-                ).execute()
-            elif "uob" in payment_method.lower():
-                service.spreadsheets().values().append(
-                    spreadsheetId="1woLn_OuCpE5GQ-btYTacSTS2N738itIStWhXy0XkXww",
-                    range="UOB!E:I",
-                    body=resource,
-                    valueInputOption="USER_ENTERED",
-                ).execute()
             return True
         else:
             return False
 
-    except HttpError as err:
+    except PartialAppendError as err:
         print(f"❌ Error: {err}")
         return False
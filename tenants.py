@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from classifier import Classifier, LABELS_CSV, CACHE_PATH, default_classifier
+from sheets_helper import SheetsClient, default_client, read_routes
+
+logger = logging.getLogger(__name__)
+
+# Each web user / Telegram chat gets its own spreadsheet, labels and routes.
+# Without this file the single-user SPREADSHEET_ID / WEB_USERNAME settings are used.
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+# How many tenants keep a loaded classifier and Sheets client, and for how long when idle (0 = forever)
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", "32"))
+TENANT_IDLE_TTL = int(os.getenv("TENANT_IDLE_TTL", "1800"))
+
+
+def load_tenants(path=TENANTS_FILE):
+    """
+    Tenant name -> settings, from the JSON file at path.
+
+    {"alice": {"password_hash": "...", "spreadsheet_id": "...", "labels_csv": "labels/alice.csv",
+               "routes_file": "routes/alice.json", "token_file": "tokens/alice.json",
+               "telegram_chat_ids": [123456789]}}
+
+    Web logins need a password_hash (werkzeug format); plain passwords are
+    refused so that start-up does not run PBKDF2 once per tenant. If there is
+    no file, a single tenant is built from the .env settings and keeps the
+    process-wide classifier, Sheets client and routing table.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        name = os.getenv("WEB_USERNAME") or "default"
+        return {name: {
+            "name": name,
+            "password": os.getenv("WEB_PASSWORD"),
+            "spreadsheet_id": os.getenv("SPREADSHEET_ID"),
+            "shared": True,
+        }}
+
+    tenants = {}
+    for name, settings in raw.items():
+        if not settings.get("spreadsheet_id"):
+            raise ValueError(f"Tenant {name!r} in {path} has no spreadsheet_id")
+        # load_routes would fall back to the operator's bank tabs, so a missing file is an error
+        if settings.get("routes_file") and not os.path.exists(settings["routes_file"]):
+            raise ValueError(f"Tenant {name!r} in {path}: routes_file {settings['routes_file']} not found")
+        if "password" in settings:
+            raise ValueError(f"Tenant {name!r} in {path} has a plain password, store password_hash instead")
+        tenants[name] = dict(settings, name=name)
+    logger.info(f"Loaded {len(tenants)} tenants from {path}")
+    return tenants
+
+
+def tenant_cache_path(name):
+    """Per-tenant classification cache file next to CLASSIFY_CACHE_PATH."""
+    root, ext = os.path.splitext(CACHE_PATH)
+    safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    # The hash keeps names that sanitise alike ("a.b", "a_b") apart
+    digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:8]
+    return f"{root}-{safe_name}-{digest}{ext or '.json'}"
+
+
+class TenantState:
+    """A tenant's spreadsheet, classifier, Sheets client and routing table."""
+
+    def __init__(self, settings):
+        self.name = settings["name"]
+        self.spreadsheet_id = settings["spreadsheet_id"]
+        if settings.get("shared"):
+            self.classifier = default_classifier
+            self.sheets = default_client
+        else:
+            self.classifier = Classifier(csv_path=settings.get("labels_csv", LABELS_CSV),
+                                         cache_path=tenant_cache_path(self.name))
+            self.sheets = SheetsClient(token_path=settings.get("token_file", "token.json"))
+        if settings.get("shared"):
+            # None means the default routing table (SHEET_ROUTES_FILE)
+            self.routes = None
+        else:
+            # Never fall back to the default table: it points at the operator's spreadsheet
+            routes = settings.get("routes")
+            if routes is None and settings.get("routes_file"):
+                try:
+                    routes = read_routes(settings["routes_file"])
+                except FileNotFoundError:
+                    logger.warning(f"Tenant {self.name}: {settings['routes_file']} is gone, no bank tabs")
+                    routes = []
+            self.routes = self._own_routes(routes or [])
+
+    def _own_routes(self, routes):
+        """Routes with targets that name no spreadsheet_id pointed at the tenant's own."""
+        return [
+            dict(route, targets=[
+                dict(target, spreadsheet_id=target.get("spreadsheet_id") or self.spreadsheet_id)
+                for target in route["targets"]
+            ])
+            for route in routes
+        ]
+
+    def service(self):
+        return self.sheets.service()
+
+
+class TenantCache:
+    """
+    Loaded TenantState objects, most recently used last.
+
+    Labels, similarity index and Sheets service are built once per tenant and
+    reused across requests. The least recently used tenant is dropped when
+    more than max_size are loaded, and any tenant unused for idle_ttl seconds
+    is dropped on the next lookup; it is rebuilt on its next request.
+    """
+
+    def __init__(self, tenants, max_size=TENANT_CACHE_SIZE, idle_ttl=TENANT_IDLE_TTL):
+        self.tenants = tenants
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.builds = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._chats = {
+            int(chat_id): name
+            for name, settings in tenants.items()
+            for chat_id in settings.get("telegram_chat_ids", [])
+        }
+
+    def get(self, name):
+        """State for the named tenant, or None if there is no such tenant."""
+        settings = self.tenants.get(name)
+        if settings is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._states.get(name)
+            if entry is None:
+                entry = self._states[name] = [TenantState(settings), now]
+                self.builds += 1
+                while len(self._states) > self.max_size:
+                    evicted, _ = self._states.popitem(last=False)
+                    self.evictions += 1
+                    logger.info(f"Tenant {evicted} evicted from cache")
+            else:
+                self._states.move_to_end(name)
+                entry[1] = now
+            return entry[0]
+
+    def for_chat(self, chat_id):
+        """State for the tenant a Telegram chat belongs to, or None if it has none."""
+        if len(self.tenants) == 1 and next(iter(self.tenants.values())).get("shared"):
+            # Single-user setup: every chat writes to SPREADSHEET_ID as before
+            return self.get(next(iter(self.tenants)))
+        name = self._chats.get(int(chat_id))
+        return self.get(name) if name is not None else None
+
+    def _expire(self, now):
+        # Entries are in last-used order, so stop at the first one still fresh
+        while self._states and self.idle_ttl > 0:
+            name, (_, last_used) = next(iter(self._states.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            del self._states[name]
+            self.expirations += 1
+            logger.info(f"Tenant {name} expired after {self.idle_ttl}s idle")
+
+    def preload(self, connect=False):
+        """
+        Load labels and similarity indexes for as many tenants as the cache
+        holds, and with connect also authorise their Sheets clients.
+        """
+        for name in list(self.tenants)[:self.max_size]:
+            state = self.get(name)
+            state.classifier.load()
+            if connect:
+                state.service()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tenants": len(self.tenants),
+                "loaded": len(self._states),
+                "max_size": self.max_size,
+                "idle_ttl": self.idle_ttl,
+                "builds": self.builds,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }